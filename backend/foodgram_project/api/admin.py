@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from api.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                        ShoppingCart, Tag)
+                        ShoppingCart, ShoppingCartIngredient, Tag)
 
 
 @admin.register(Tag)
@@ -39,8 +39,11 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     search_fields = ('name',)
 
+    @admin.display(
+        description='Добавлений в избранное', ordering='favorites_count'
+    )
     def quantity_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(IngredientInRecipe)
@@ -69,3 +72,13 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user',
         'recipe',
     )
+
+
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'user',
+        'ingredient',
+        'amount',
+    )
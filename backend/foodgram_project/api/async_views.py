@@ -0,0 +1,215 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.filters import RecipeFilter
+from api.models import Ingredient, Recipe, Tag
+from api.relations import get_user_relations
+from api.search import ingredient_index
+from api.serializers import (IngredientSerializer, RecipeSerializer,
+                             TagSerializer)
+from users.authentication import CachedTokenAuthentication
+from users.serializers import FollowListSerializer
+from users.views import get_subscriptions
+
+
+def database(func):
+    """Выполняет код ORM в отдельном потоке со своим соединением"""
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+@database
+def authenticate(request):
+    user = CachedTokenAuthentication().authenticate(request)
+    return user[0] if user else AnonymousUser()
+
+
+@database
+def serialize(serializer_class, instance, request, many=False):
+    return serializer_class(
+        instance, many=many, context={'request': request}
+    ).data
+
+
+def not_found(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except Http404:
+            error = NotFound()
+        except NotFound as raised:
+            error = raised
+        return response({'detail': error.detail}, status=error.status_code)
+    return wrapper
+
+
+def invalid_page():
+    return NotFound(PageNumberPagination.invalid_page_message)
+
+
+def get_page_params(request):
+    try:
+        limit = int(request.GET['limit'])
+    except (KeyError, ValueError):
+        return None, None
+    if limit < 1:
+        return None, None
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise invalid_page()
+    if page < 1:
+        raise invalid_page()
+    return limit, page
+
+
+def get_page_links(request, count, limit, page):
+    url = request.build_absolute_uri()
+    next_link = None
+    if page * limit < count:
+        next_link = replace_query_param(url, 'page', page + 1)
+    previous_link = None
+    if page == 2:
+        previous_link = remove_query_param(url, 'page')
+    elif page > 2:
+        previous_link = replace_query_param(url, 'page', page - 1)
+    return next_link, previous_link
+
+
+async def paginate(request, queryset, serializer_class, *preload):
+    limit, page = get_page_params(request)
+    if limit is None:
+        objects, *_ = await asyncio.gather(
+            database(list)(queryset), *preload
+        )
+        return await serialize(serializer_class, objects, request, many=True)
+    offset = (page - 1) * limit
+    count, objects, *_ = await asyncio.gather(
+        database(queryset.count)(),
+        database(list)(queryset[offset:offset + limit]),
+        *preload
+    )
+    if not objects and page > 1:
+        raise invalid_page()
+    next_link, previous_link = get_page_links(request, count, limit, page)
+    return {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': await serialize(
+            serializer_class, objects, request, many=True
+        ),
+    }
+
+
+def with_user(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request.user = await authenticate(request)
+        except AuthenticationFailed as error:
+            return response({'detail': error.detail}, status=401)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@database
+def filter_recipes(request):
+    filterset = RecipeFilter(
+        request.GET, queryset=Recipe.objects.select_related('author'),
+        request=request
+    )
+    if not filterset.is_valid():
+        return None, filterset.errors
+    return filterset.qs, None
+
+
+@not_found
+@with_user
+async def recipe_list(request):
+    queryset, errors = await filter_recipes(request)
+    if errors:
+        return response(errors, status=400)
+    return response(await paginate(
+        request, queryset, RecipeSerializer,
+        database(get_user_relations)(request)
+    ))
+
+
+@not_found
+@with_user
+async def recipe_detail(request, pk):
+    recipe, _ = await asyncio.gather(
+        database(get_object_or_404)(
+            Recipe.objects.select_related('author'), pk=pk
+        ),
+        database(get_user_relations)(request),
+    )
+    return response(await serialize(RecipeSerializer, recipe, request))
+
+
+async def tag_list(request):
+    return response(await serialize(
+        TagSerializer, Tag.objects.all(), request, many=True
+    ))
+
+
+@not_found
+async def tag_detail(request, pk):
+    tag = await database(get_object_or_404)(Tag, pk=pk)
+    return response(await serialize(TagSerializer, tag, request))
+
+
+async def ingredient_list(request):
+    name = request.GET.get('name')
+    if name:
+        return response(await database(ingredient_index.search)(name))
+    return response(await serialize(
+        IngredientSerializer, Ingredient.objects.all(), request, many=True
+    ))
+
+
+@not_found
+async def ingredient_detail(request, pk):
+    ingredient = await database(get_object_or_404)(Ingredient, pk=pk)
+    return response(await serialize(IngredientSerializer, ingredient, request))
+
+
+@not_found
+@with_user
+async def subscription_list(request):
+    if request.user.is_anonymous:
+        return response(
+            {'detail': 'Учетные данные не были предоставлены.'}, status=401
+        )
+    try:
+        recipes_limit = int(request.GET['recipes_limit'])
+    except (KeyError, ValueError):
+        recipes_limit = None
+    return response(await paginate(
+        request, get_subscriptions(request.user, recipes_limit),
+        FollowListSerializer
+    ))
@@ -0,0 +1,214 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from api.models import Recipe
+
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+PANTRY_VERSION = 'pantry'
+
+
+def initial_version():
+    return time.time_ns()
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    return cache.get_or_set(version_key(name), initial_version, timeout=None)
+
+
+def bump_version(name):
+    try:
+        return cache.incr(version_key(name))
+    except ValueError:
+        return get_version(name)
+
+
+def get_versions(*names):
+    keys = {version_key(name): name for name in names}
+    found = cache.get_many(keys)
+    return [
+        found[key] if key in found else get_version(name)
+        for key, name in keys.items()
+    ]
+
+
+def recipe_version(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def user_version(user_id):
+    return f'user:{user_id}'
+
+
+def relations_version(user_id):
+    return f'relations:{user_id}'
+
+
+def make_etag(*parts):
+    return hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def catalog_etag(name):
+    def etag(request, *args, **kwargs):
+        return make_etag(
+            name, get_version(name), request.accepted_renderer.format
+        )
+    return etag
+
+
+def recipe_etag(request, pk, *args, **kwargs):
+    recipe = Recipe.objects.filter(pk=pk).values(
+        'updated', 'author_id'
+    ).first()
+    if recipe is None:
+        return None
+    parts = [
+        pk,
+        recipe['updated'].isoformat(),
+        *get_versions(
+            recipe_version(pk),
+            TAGS_VERSION,
+            INGREDIENTS_VERSION,
+            user_version(recipe['author_id']),
+        ),
+        request.accepted_renderer.format,
+    ]
+    if request.user.is_authenticated:
+        parts += [
+            request.user.id,
+            get_version(relations_version(request.user.id)),
+        ]
+    return make_etag(*parts)
+
+
+class LRUCache:
+    def __init__(self, maxsize, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None
+        if self.timeout is not None:
+            expires = time.monotonic() + self.timeout
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+
+class TieredCache:
+    def __init__(self, maxsize, alias=None, timeout=None, local_timeout=None):
+        self.local = None
+        if local_timeout != 0:
+            self.local = LRUCache(
+                maxsize, timeout if local_timeout is None else local_timeout
+            )
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def get_local(self, key):
+        return self.local.get(key) if self.local is not None else None
+
+    def set_local(self, key, value):
+        if self.local is not None:
+            self.local.set(key, value)
+
+    def get(self, key):
+        value = self.get_local(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.set_local(key, value)
+        return value
+
+    def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.get_local(key)
+            if value is not None:
+                found[key] = value
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared is not None:
+            shared = self.shared.get_many(missing)
+            for key, value in shared.items():
+                self.set_local(key, value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value):
+        self.set_local(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, self.timeout)
+
+    def set_many(self, data):
+        for key, value in data.items():
+            self.set_local(key, value)
+        if data and self.shared is not None:
+            self.shared.set_many(data, self.timeout)
+
+    def delete(self, key):
+        if self.local is not None:
+            self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+
+representation_cache = TieredCache(
+    settings.RECIPE_REPRESENTATION_CACHE_SIZE,
+    alias=settings.RECIPE_REPRESENTATION_CACHE_ALIAS,
+    timeout=settings.RECIPE_REPRESENTATION_CACHE_TIMEOUT
+)
+
+
+def recipe_representation_keys(recipes, request):
+    host = request.build_absolute_uri('/') if request is not None else ''
+    names = list(dict.fromkeys([TAGS_VERSION, INGREDIENTS_VERSION] + [
+        name for recipe in recipes for name in (
+            recipe_version(recipe.id), user_version(recipe.author_id)
+        )
+    ]))
+    versions = dict(zip(names, get_versions(*names)))
+    return [
+        'recipe-representation:{}:{}'.format(recipe.id, make_etag(
+            host,
+            recipe.updated.isoformat(),
+            versions[recipe_version(recipe.id)],
+            versions[TAGS_VERSION],
+            versions[INGREDIENTS_VERSION],
+            versions[user_version(recipe.author_id)],
+        )) for recipe in recipes
+    ]
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+
+class LimitedBase64ImageField(Base64ImageField):
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str):
+            encoded = base64_data.rpartition(';base64,')[2]
+            if len(encoded) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения не должен превышать '
+                    f'{settings.RECIPE_IMAGE_MAX_SIZE // 1024 ** 2} МБ'
+                )
+        return super().to_internal_value(base64_data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for name, formats in value.items():
+            variants[name] = {}
+            for image_format, path in formats.items():
+                url = default_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[name][image_format] = url
+        return variants
@@ -1,11 +1,7 @@
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
 
 from api.models import Recipe, User
-
-
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
+from api.search import search_recipes
 
 
 class RecipeFilter(FilterSet):
@@ -15,10 +11,17 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.OrderingFilter(
+        fields=('pub_date', 'favorites_count')
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search',
+            'ordering'
+        )
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -29,3 +32,6 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
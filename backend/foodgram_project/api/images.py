@@ -0,0 +1,90 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from api.caches import bump_version, recipe_version
+from api.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = (
+    ('jpeg', 'JPEG', 'jpg'),
+    ('webp', 'WEBP', 'webp'),
+)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.RECIPE_IMAGE_WORKERS,
+        thread_name_prefix='recipe-images'
+    )
+
+
+def render_variant(image, size, pil_format):
+    variant = image.copy()
+    variant.thumbnail(size)
+    buffer = BytesIO()
+    variant.save(buffer, pil_format, quality=85)
+    return ContentFile(buffer.getvalue())
+
+
+def delete_image_variants(variants):
+    for formats in variants.values():
+        for path in formats.values():
+            default_storage.delete(path)
+
+
+def build_image_variants(recipe_id, stale=None):
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    variants = {}
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        image = image.convert('RGB')
+        for name, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            variants[name] = {}
+            for image_format, pil_format, extension in IMAGE_FORMATS:
+                variants[name][image_format] = default_storage.save(
+                    f'recipes/variants/{stem}_{name}.{extension}',
+                    render_variant(image, size, pil_format)
+                )
+    if not Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_variants=variants, updated=timezone.now()):
+        delete_image_variants(variants)
+        return
+    bump_version(recipe_version(recipe_id))
+    delete_image_variants(recipe.image_variants)
+    if stale:
+        delete_image_variants(stale)
+
+
+def run_image_job(recipe_id, stale=None):
+    try:
+        build_image_variants(recipe_id, stale)
+    except Exception:
+        logger.exception('Failed to build image variants of %s', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_image_variants(recipe, stale=None):
+    if not settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(lambda: build_image_variants(recipe.pk, stale))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run_image_job, recipe.pk, stale)
+    )
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from colorama import Fore, init
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api.middleware import QueryStats
+from api.models import Ingredient, Recipe, ShoppingCart, Tag
+from api.serializers import RecipeSerializer
+from users.models import Follow, User
+
+init(autoreset=True)
+
+PAGE_SIZE = 6
+PERCENTILES = (50, 90, 99)
+THROUGHPUT_CASES = (
+    'recipe list', 'recipe detail', 'tag list', 'subscriptions',
+    'ingredient search',
+)
+
+
+def percentile(samples, rank):
+    ordered = sorted(samples)
+    index = max(0, round(rank / 100 * len(ordered)) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Замеряет время ответа основных эндпоинтов API"""
+    help = 'Benchmark key API endpoints and serializers, report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Write results to this file')
+        parser.add_argument(
+            '--compare', help='Baseline JSON to compare the results with'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=0,
+            help='Also compare WSGI and async throughput with this many '
+                 'concurrent requests'
+        )
+
+    def get_user(self):
+        cart = ShoppingCart.objects.values_list('user', flat=True).first()
+        follow = Follow.objects.values_list('user', flat=True).first()
+        user = User.objects.filter(pk=cart or follow).first()
+        if user is None:
+            raise CommandError(
+                'No data to benchmark, run generate_dataset first'
+            )
+        return user
+
+    def get_cases(self, user):
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        tags = Tag.objects.values_list('slug', flat=True)[:2]
+        ingredient = Ingredient.objects.values_list('name', flat=True).first()
+        tag_query = '&'.join(f'tags={slug}' for slug in tags)
+        recipes = f'/api/recipes/?limit={PAGE_SIZE}'
+        return {
+            'recipe list': recipes,
+            'recipe list (cursor)': f'{recipes}&pagination=cursor',
+            'recipe detail': f'/api/recipes/{recipe.pk}/',
+            'tag list': '/api/tags/',
+            'recipes by tags': f'{recipes}&{tag_query}',
+            'recipes by author': f'{recipes}&author={recipe.author_id}',
+            'favorite recipes': f'{recipes}&is_favorited=1',
+            'recipes in shopping cart': f'{recipes}&is_in_shopping_cart=1',
+            'recipe search': f'{recipes}&search={recipe.name.split()[0]}',
+            'subscriptions': (
+                f'/api/users/subscriptions/?limit={PAGE_SIZE}&recipes_limit=3'
+            ),
+            'shopping list': '/api/recipes/download_shopping_cart/',
+            'ingredient search': f'/api/ingredients/?name={ingredient[:3]}',
+        }
+
+    def request(self, client, url):
+        def call():
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response.status_code
+        return call
+
+    def serialize(self, user):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = user
+        recipes = list(Recipe.objects.with_related()[:PAGE_SIZE])
+
+        def call():
+            RecipeSerializer(
+                recipes, many=True, context={'request': request}
+            ).data
+            return 200
+        return call
+
+    def measure(self, call, iterations, warmup):
+        for _ in range(warmup):
+            call()
+        queries = QueryStats()
+        with connection.execute_wrapper(queries):
+            status = call()
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - started) * 1000)
+        result = {'status': status, 'queries': queries.count}
+        for rank in PERCENTILES:
+            result[f'p{rank}'] = round(percentile(samples, rank), 2)
+        result['mean'] = round(sum(samples) / len(samples), 2)
+        return result
+
+    def report(self, results, baseline):
+        for name, result in results.items():
+            line = (
+                f'  {name:<26} p50 {result["p50"]:>8.2f} ms  '
+                f'p99 {result["p99"]:>8.2f} ms  {result["queries"]:>3} queries'
+            )
+            previous = baseline.get(name)
+            if previous:
+                delta = result['p50'] - previous['p50']
+                color = Fore.RED if delta > 0 else Fore.GREEN
+                line += color + f'  {delta:+.2f} ms'
+            self.stdout.write(line)
+
+    def sync_throughput(self, url, total, concurrency):
+        def call(_):
+            return Client(HTTP_AUTHORIZATION=self.authorization).get(url)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(call, range(total)))
+        return total / (time.perf_counter() - started)
+
+    async def async_throughput(self, url, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                await client.get(url, authorization=self.authorization)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(total)))
+        return total / (time.perf_counter() - started)
+
+    def throughput(self, cases, total, concurrency):
+        results = {}
+        for name in THROUGHPUT_CASES:
+            url = cases[name]
+            async_url = url.replace('/api/', '/api/async/', 1)
+            wsgi = self.sync_throughput(url, total, concurrency)
+            asgi = asyncio.run(
+                self.async_throughput(async_url, total, concurrency)
+            )
+            results[name] = {'wsgi': round(wsgi, 1), 'async': round(asgi, 1)}
+            self.stdout.write(
+                f'  {name:<26} wsgi {wsgi:>8.1f} req/s  '
+                f'async {asgi:>8.1f} req/s'
+            )
+        return results
+
+    def handle(self, *args, **options):
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        user = self.get_user()
+        token, _ = Token.objects.get_or_create(user=user)
+        self.authorization = f'Token {token.key}'
+        client = Client(HTTP_AUTHORIZATION=self.authorization)
+        cases = self.get_cases(user)
+        calls = {
+            name: self.request(client, url) for name, url in cases.items()
+        }
+        calls['recipe serializer'] = self.serialize(user)
+        results = {
+            name: self.measure(call, options['iterations'], options['warmup'])
+            for name, call in calls.items()
+        }
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        self.report(results, baseline)
+        throughput = None
+        if options['concurrency']:
+            throughput = self.throughput(
+                cases, options['iterations'], options['concurrency']
+            )
+        data = json.dumps({
+            'commit': git_commit(),
+            'database': connection.vendor,
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'results': results,
+            'throughput': throughput,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data)
+            self.stdout.write(Fore.GREEN + f'  Saved to {options["output"]}')
+        else:
+            self.stdout.write(data)
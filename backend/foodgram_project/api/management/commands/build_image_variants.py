@@ -0,0 +1,32 @@
+from colorama import Fore, init
+from django.core.management.base import BaseCommand
+
+from api.images import build_image_variants
+from api.models import Recipe
+
+init(autoreset=True)
+
+
+class Command(BaseCommand):
+    """Создаёт уменьшенные копии и WebP-варианты фотографий рецептов"""
+    help = 'Build thumbnails and WebP variants of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild variants of recipes that already have them'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        built = 0
+        for recipe_id in recipes.values_list('pk', flat=True).iterator():
+            try:
+                build_image_variants(recipe_id)
+                built += 1
+            except Exception as error:
+                self.stderr.write(Fore.RED + f'Recipe {recipe_id}: {error}')
+        self.stdout.write(Fore.GREEN + f'OK ({built} recipes)')
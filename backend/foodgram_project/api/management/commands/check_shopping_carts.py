@@ -0,0 +1,65 @@
+from colorama import Fore, init
+from django.core.management.base import BaseCommand
+
+from api.models import ShoppingCartIngredient
+from api.services import (get_shopping_cart_totals,
+                          refresh_shopping_cart_ingredients)
+
+init(autoreset=True)
+
+
+class Command(BaseCommand):
+    """Сверяет и пересобирает агрегаты списков покупок"""
+    help = 'Check shopping cart ingredient totals and optionally rebuild them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Refresh totals of users with inconsistent rows'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild the whole table from shopping carts'
+        )
+
+    def find_drift(self):
+        expected = {}
+        for total in get_shopping_cart_totals().iterator():
+            ingredient = total['recipe__recipe_ingredients__ingredient']
+            expected[(total['user'], ingredient)] = total['total']
+        actual = {
+            (row['user'], row['ingredient']): row['amount']
+            for row in ShoppingCartIngredient.objects.values(
+                'user', 'ingredient', 'amount'
+            ).iterator()
+        }
+        return {
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        }
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write(
+                '  Rebuilding shopping cart totals', ending='... '
+            )
+            refresh_shopping_cart_ingredients()
+            self.stdout.write(Fore.GREEN + 'OK')
+            return
+        drift = self.find_drift()
+        if not drift:
+            self.stdout.write(
+                Fore.GREEN + 'Shopping cart totals are consistent'
+            )
+            return
+        users = sorted({user for user, __ in drift})
+        self.stderr.write(
+            Fore.RED + f'{len(drift)} inconsistent totals '
+            f'for {len(users)} users'
+        )
+        if options['fix']:
+            self.stdout.write('  Refreshing affected users', ending='... ')
+            refresh_shopping_cart_ingredients(users=users)
+            self.stdout.write(Fore.GREEN + 'OK')
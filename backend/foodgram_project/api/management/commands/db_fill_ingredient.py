@@ -1,44 +1,135 @@
 import csv
+import io
+import json
+import os
+import time
+from itertools import islice
 
 from colorama import Fore, init
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from api.caches import INGREDIENTS_VERSION, bump_version
 from api.models import Ingredient
 
 init(autoreset=True)
 
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+
 
 class Command(BaseCommand):
     """Наполняет базу данных тестовыми данными"""
     help = 'Load ingredients data to DB'
 
-    def fill_table_ingredient(self):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DEFAULT_PATH,
+            help='CSV or JSON file with ingredients'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows sent to the database at once'
+        )
+
+    def read_csv(self, path):
+        with open(path, encoding='utf-8') as csvfile:
+            for row in csv.reader(csvfile, delimiter=','):
+                yield row[0], row[1]
+
+    def read_json(self, path):
+        with open(path, encoding='utf-8') as jsonfile:
+            for item in json.load(jsonfile):
+                yield item['name'], item['measurement_unit']
+
+    def read_rows(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return self.read_csv(path)
+        if extension == '.json':
+            return self.read_json(path)
+        raise CommandError(f'Unsupported file format: {extension}')
+
+    def batches(self, rows, batch_size):
+        rows = iter(rows)
+        batch = list(islice(rows, batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, batch_size))
+
+    def copy_batch(self, cursor, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor.copy_expert(
+            'COPY ingredient_load (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+
+    def load_with_copy(self, batches):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_load '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            for batch in batches:
+                self.copy_batch(cursor, batch)
+                yield len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit FROM ingredient_load '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def load_with_bulk_create(self, batches):
+        for batch in batches:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch],
+                ignore_conflicts=True
+            )
+            yield len(batch)
+
+    def fill_table_ingredient(self, path, batch_size):
+        self.stdout.write(f'  Applying {path}')
+        batches = self.batches(self.read_rows(path), batch_size)
+        if connection.vendor == 'postgresql':
+            loader = self.load_with_copy(batches)
+        else:
+            loader = self.load_with_bulk_create(batches)
+        initial_count = Ingredient.objects.count()
+        started = time.monotonic()
+        processed = 0
+        for loaded in loader:
+            processed += loaded
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'\r  {processed} rows, {processed / elapsed:.0f} rows/s',
+                ending=''
+            )
+        elapsed = time.monotonic() - started
+        created = Ingredient.objects.count() - initial_count
+        if created:
+            bump_version(INGREDIENTS_VERSION)
         self.stdout.write(
-            '  Applying /data/ingredients.csv', ending='... '
+            Fore.GREEN + f'\n  OK: {processed} rows processed, '
+            f'{created} created in {elapsed:.2f}s'
         )
-        try:
-            with open(
-                './data/ingredients.csv', encoding='utf-8'
-            ) as csvfile:
-                reader = csv.reader(csvfile, delimiter=',')
-                for __, row in enumerate(reader):
-                    Ingredient.objects.get_or_create(
-                        name=row[0],
-                        measurement_unit=row[1],
-                    )
-            return self.stdout.write(Fore.GREEN + 'OK')
-        except Exception as error:
-            self.stderr.write(Fore.RED + 'FALSE')
-            raise Exception(error)
-        finally:
-            csvfile.close()
 
     def handle(self, *args, **options):
         self.stdout.write(
             'Operations to perform:\n'
         )
         try:
-            self.fill_table_ingredient()
+            self.fill_table_ingredient(
+                options['path'], options['batch_size']
+            )
         except Exception as error:
             self.stderr.write(
                 Fore.RED + f'Execution error - {error}!'
@@ -0,0 +1,105 @@
+import re
+
+from colorama import Fore, init
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+
+from api.models import (Favorite, FeedEntry, Ingredient, IngredientInRecipe,
+                        Recipe, ShoppingCart, ShoppingCartIngredient)
+from users.models import Follow, User
+
+init(autoreset=True)
+
+LARGE_TABLES = {
+    model._meta.db_table for model in (
+        Recipe, Recipe.tags.through, IngredientInRecipe, Favorite,
+        ShoppingCart, ShoppingCartIngredient, Follow, User, FeedEntry
+    )
+}
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+    'sqlite': re.compile(
+        r'\bSCAN (?:TABLE )?(?P<table>\w+)(?: AS \w+)?'
+        r'(?: USING (?:COVERING )?INDEX (?P<index>\w+))?'
+    ),
+}
+INDEX_ORDER_SCANS = {
+    'recipe list': 'recipe_pub_date_idx',
+}
+
+
+class Command(BaseCommand):
+    """Проверяет планы основных запросов API на полные просмотры таблиц"""
+    help = 'Fail if hot API queries plan a sequential scan of a large table'
+
+    def get_querysets(self, user_id):
+        recipes = Recipe.objects.order_by('-pub_date', '-id')
+        return {
+            'recipe list': recipes[:6],
+            'recipes by tag': recipes.filter(
+                tags__slug__in=['breakfast', 'lunch']
+            ).distinct()[:6],
+            'recipes by author': recipes.filter(author_id=user_id)[:6],
+            'favorite recipes': recipes.filter(
+                favorites__user_id=user_id
+            )[:6],
+            'recipes in shopping cart': recipes.filter(
+                shopping_carts__user_id=user_id
+            )[:6],
+            'recipe ingredients': IngredientInRecipe.objects.filter(
+                recipe_id__in=[1, 2, 3]
+            ).select_related('ingredient'),
+            'shopping list': ShoppingCartIngredient.objects.filter(
+                user_id=user_id
+            ).order_by('ingredient__name'),
+            'subscription feed': Recipe.objects.filter(
+                feed_entries__user_id=user_id
+            ).annotate(
+                feed_date=F('feed_entries__pub_date')
+            ).order_by('-feed_date', '-id')[:6],
+            'subscriptions': User.objects.filter(
+                following__user_id=user_id
+            )[:6],
+            'recent recipes of author': recipes.filter(
+                author_id=user_id
+            ).values('pk')[:3],
+            'ingredient by name': Ingredient.objects.filter(name='соль'),
+        }
+
+    def find_sequential_scans(self, plan, allowed_index=None):
+        pattern = SEQUENTIAL_SCAN.get(connection.vendor)
+        if pattern is None:
+            return set()
+        return {
+            scan['table'] for scan in pattern.finditer(plan)
+            if scan['table'] in LARGE_TABLES
+            and (allowed_index is None
+                 or scan.groupdict().get('index') != allowed_index)
+        }
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        user_id = User.objects.values_list('pk', flat=True).first() or 0
+        failed = []
+        for name, queryset in self.get_querysets(user_id).items():
+            plan = queryset.explain()
+            scans = self.find_sequential_scans(
+                plan, INDEX_ORDER_SCANS.get(name)
+            )
+            if scans:
+                failed.append(name)
+                self.stdout.write(
+                    Fore.RED + f'  {name}: sequential scan of '
+                    f'{", ".join(sorted(scans))}\n{plan}'
+                )
+            else:
+                self.stdout.write(Fore.GREEN + f'  {name}: OK')
+        if failed:
+            raise CommandError(
+                f'Sequential scans in {len(failed)} queries: '
+                f'{", ".join(failed)}'
+            )
@@ -0,0 +1,196 @@
+import io
+import random
+from datetime import timedelta
+
+from colorama import Fore, init
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from api.caches import PANTRY_VERSION, bump_version
+from api.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                        ShoppingCart, Tag)
+from api.search import update_search_vectors
+from api.services import (rebuild_feeds, reconcile_counters,
+                          refresh_shopping_cart_ingredients)
+from api.similarity import rebuild_similar_recipes
+from users.models import Follow, User
+
+init(autoreset=True)
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F3C14B', 'dessert'),
+    ('Выпечка', '#B5651D', 'bakery'),
+    ('Вегетарианское', '#2E8B57', 'vegetarian'),
+)
+DISHES = (
+    'Салат', 'Суп', 'Рагу', 'Запеканка', 'Пирог', 'Омлет', 'Паста',
+    'Каша', 'Смузи', 'Котлеты', 'Блины', 'Соус',
+)
+IMAGE_PATH = 'recipes/images/dataset.png'
+PASSWORD = 'dataset-password'
+
+
+class Command(BaseCommand):
+    """Генерирует синтетические данные для нагрузочного тестирования"""
+    help = 'Bulk-generate users, recipes and relations for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Favorite recipes per user')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Recipes in the shopping cart per user')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Followed authors per user')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def user_pks(self, usernames):
+        pks = {}
+        for start in range(0, len(usernames), self.batch_size):
+            pks.update(User.objects.filter(
+                username__in=usernames[start:start + self.batch_size]
+            ).values_list('username', 'pk'))
+        return [pks[username] for username in usernames if username in pks]
+
+    def step(self, message, model, objects):
+        self.stdout.write(f'  {message}', ending='... ')
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        self.stdout.write(Fore.GREEN + 'OK')
+
+    def prepare_catalog(self):
+        if not Ingredient.objects.exists():
+            call_command('db_fill_ingredient')
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        if not default_storage.exists(IMAGE_PATH):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), '#E26C2D').save(buffer, 'PNG')
+            default_storage.save(IMAGE_PATH, ContentFile(buffer.getvalue()))
+        return (
+            list(Ingredient.objects.values_list('pk', 'name')),
+            list(Tag.objects.values_list('pk', flat=True)),
+        )
+
+    def create_users(self, count):
+        start = User.objects.count()
+        password = make_password(PASSWORD)
+        users = [
+            User(
+                username=f'user{number}',
+                email=f'user{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            ) for number in range(start, start + count)
+        ]
+        self.step('Creating users', User, users)
+        return self.user_pks([user.username for user in users])
+
+    def create_recipes(self, count, authors, ingredients):
+        recipes = []
+        for _ in range(count):
+            dish = random.choice(DISHES)
+            main = random.choice(ingredients)[1]
+            recipes.append(Recipe(
+                author_id=random.choice(authors),
+                name=f'{dish} ({main})'[:200],
+                image=IMAGE_PATH,
+                text=f'{dish} с основным ингредиентом: {main}.'[:200],
+                cooking_time=random.randint(5, 180),
+            ))
+        last_pk = Recipe.objects.aggregate(last_pk=Max('pk'))['last_pk']
+        self.step('Creating recipes', Recipe, recipes)
+        pks = list(Recipe.objects.filter(
+            pk__gt=last_pk or 0
+        ).order_by('pk').values_list('pk', flat=True))
+        now = timezone.now()
+        dated = [
+            Recipe(pk=pk, pub_date=now - timedelta(
+                minutes=random.randint(0, 365 * 24 * 60)
+            )) for pk in pks
+        ]
+        Recipe.objects.bulk_update(
+            dated, ['pub_date'], batch_size=self.batch_size
+        )
+        return pks
+
+    def create_recipe_relations(self, recipes, ingredients, tags):
+        self.step('Tagging recipes', Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.sample(tags, random.randint(1, 3))
+        ])
+        self.step('Adding ingredients', IngredientInRecipe, [
+            IngredientInRecipe(
+                recipe_id=recipe, ingredient_id=ingredient,
+                amount=random.randint(1, 500)
+            )
+            for recipe in recipes
+            for ingredient, _ in self.sample(
+                ingredients, random.randint(3, 12)
+            )
+        ])
+
+    def sample(self, population, count):
+        return random.sample(population, min(count, len(population)))
+
+    def create_user_relations(self, users, recipes, options):
+        self.step('Adding favorites', Favorite, [
+            Favorite(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.sample(recipes, options['favorites'])
+        ])
+        self.step('Filling shopping carts', ShoppingCart, [
+            ShoppingCart(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.sample(recipes, options['cart'])
+        ])
+        self.step('Adding follows', Follow, [
+            Follow(user_id=user, following_id=author)
+            for user in users
+            for author in [
+                author for author in self.sample(users, options['follows'] + 1)
+                if author != user
+            ][:options['follows']]
+        ])
+
+    def finalize(self):
+        self.stdout.write('  Updating derived data', ending='... ')
+        reconcile_counters()
+        refresh_shopping_cart_ingredients()
+        update_search_vectors()
+        rebuild_feeds()
+        rebuild_similar_recipes()
+        bump_version(PANTRY_VERSION)
+        self.stdout.write(Fore.GREEN + 'OK')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredients, tags = self.prepare_catalog()
+        users = self.create_users(options['users'])
+        recipes = self.create_recipes(
+            options['recipes'], users, ingredients
+        )
+        self.create_recipe_relations(recipes, ingredients, tags)
+        self.create_user_relations(users, recipes, options)
+        self.finalize()
+        self.stdout.write(
+            Fore.GREEN + f'  Generated {len(users)} users and '
+            f'{len(recipes)} recipes'
+        )
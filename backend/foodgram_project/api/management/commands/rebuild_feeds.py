@@ -0,0 +1,16 @@
+from colorama import Fore, init
+from django.core.management.base import BaseCommand
+
+from api.services import rebuild_feeds
+
+init(autoreset=True)
+
+
+class Command(BaseCommand):
+    """Пересобирает ленты подписок пользователей"""
+    help = 'Rebuild subscription feeds from follows and recipes'
+
+    def handle(self, *args, **options):
+        self.stdout.write('  Rebuilding feeds', ending='... ')
+        entries = rebuild_feeds()
+        self.stdout.write(Fore.GREEN + f'OK ({entries} entries)')
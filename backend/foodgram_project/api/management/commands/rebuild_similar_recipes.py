@@ -0,0 +1,16 @@
+from colorama import Fore, init
+from django.core.management.base import BaseCommand
+
+from api.similarity import rebuild_similar_recipes
+
+init(autoreset=True)
+
+
+class Command(BaseCommand):
+    """Пересчитывает индекс похожих рецептов"""
+    help = 'Rebuild the similar recipes index from ingredients and tags'
+
+    def handle(self, *args, **options):
+        self.stdout.write('  Rebuilding similar recipes', ending='... ')
+        entries = rebuild_similar_recipes()
+        self.stdout.write(Fore.GREEN + f'OK ({entries} entries)')
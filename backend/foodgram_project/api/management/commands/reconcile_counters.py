@@ -0,0 +1,16 @@
+from colorama import Fore, init
+from django.core.management.base import BaseCommand
+
+from api.services import reconcile_counters
+
+init(autoreset=True)
+
+
+class Command(BaseCommand):
+    """Сверяет счётчики избранного, рецептов и подписчиков"""
+    help = 'Recalculate denormalized counters that drifted from real data'
+
+    def handle(self, *args, **options):
+        for counter, fixed in reconcile_counters().items():
+            color = Fore.YELLOW if fixed else Fore.GREEN
+            self.stdout.write(color + f'  {counter}: {fixed} fixed')
@@ -0,0 +1,16 @@
+from colorama import Fore, init
+from django.core.management.base import BaseCommand
+
+from api.search import update_search_vectors
+
+init(autoreset=True)
+
+
+class Command(BaseCommand):
+    """Пересчитывает поисковые векторы рецептов"""
+    help = 'Rebuild full-text search vectors of all recipes'
+
+    def handle(self, *args, **options):
+        self.stdout.write('  Updating search vectors', ending='... ')
+        updated = update_search_vectors()
+        self.stdout.write(Fore.GREEN + f'OK ({updated} recipes)')
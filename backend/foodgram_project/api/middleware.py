@@ -0,0 +1,80 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = (0.0, None)
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            self.statements[sql] += 1
+            if duration > self.slowest[0]:
+                self.slowest = (duration, sql)
+
+    def duplicates(self, threshold):
+        return {
+            sql: count for sql, count in self.statements.most_common()
+            if count >= threshold
+        }
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, get_response):
+        config = getattr(settings, 'SQL_INSTRUMENTATION', {})
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = config.get('SERVER_TIMING', True)
+        self.slow_request_ms = config.get('SLOW_REQUEST_MS', 500)
+        self.max_queries = config.get('MAX_QUERIES', 30)
+        self.duplicate_threshold = config.get('DUPLICATE_THRESHOLD', 3)
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.duration * 1000
+        duplicates = stats.duplicates(self.duplicate_threshold)
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries", '
+                f'db-slowest;dur={stats.slowest[0] * 1000:.1f}, '
+                f'app;dur={total_ms - db_ms:.1f}'
+            )
+        if (total_ms >= self.slow_request_ms
+                or stats.count >= self.max_queries or duplicates):
+            logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': stats.count,
+                'slowest_ms': round(stats.slowest[0] * 1000, 1),
+                'slowest_sql': stats.slowest[1],
+                'duplicates': duplicates,
+            }, ensure_ascii=False))
+        return response
@@ -1,5 +1,36 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class LimitResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(LimitCursorPagination):
+    ordering = ('-pub_date', '-id')
+
+
+class FeedCursorPagination(LimitCursorPagination):
+    ordering = ('-feed_date', '-id')
+
+
+class FollowCursorPagination(LimitCursorPagination):
+    ordering = ('-id',)
+
+
+class CursorPaginationMixin:
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return 'cursor' in params or params.get('pagination') == 'cursor'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,167 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from foodgram_project.replicas import primary_reads
+
+from api.caches import PANTRY_VERSION, bump_version, get_version
+from api.models import IngredientInRecipe
+
+
+def change_key(version):
+    return f'pantry-change:{version}'
+
+
+def record_pantry_change(recipe_id):
+    version = bump_version(PANTRY_VERSION)
+    cache.set(
+        change_key(version), recipe_id, settings.PANTRY_CHANGE_LOG_TIMEOUT
+    )
+
+
+def iter_bits(mask):
+    while mask:
+        position = mask.bit_length() - 1
+        yield position
+        mask ^= 1 << position
+
+
+class PantryMatch:
+    def __init__(self, recipe_id, missing, coverage):
+        self.recipe_id = recipe_id
+        self.missing = missing
+        self.coverage = coverage
+
+
+class PantryIndex:
+    def __init__(self):
+        self.version = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.slots = {}
+        self.recipes = []
+        self.ingredients = {}
+        self.masks = defaultdict(int)
+        self.sizes = defaultdict(int)
+
+    def load(self, recipes=None):
+        rows = IngredientInRecipe.objects.values_list('recipe', 'ingredient')
+        if recipes is not None:
+            rows = rows.filter(recipe__in=recipes)
+        ingredients = defaultdict(set)
+        for recipe, ingredient in rows.order_by('recipe').iterator():
+            ingredients[recipe].add(ingredient)
+        return ingredients
+
+    def remove(self, recipe):
+        slot = self.slots.pop(recipe, None)
+        if slot is None:
+            return
+        keep = ~(1 << slot)
+        items = self.ingredients.pop(slot)
+        for ingredient in items:
+            self.masks[ingredient] &= keep
+        self.sizes[len(items)] &= keep
+        self.recipes[slot] = None
+
+    def add(self, recipe, items):
+        slot = self.slots.get(recipe)
+        if slot is None:
+            slot = len(self.recipes)
+            self.recipes.append(recipe)
+        else:
+            self.remove(recipe)
+            self.recipes[slot] = recipe
+        self.slots[recipe] = slot
+        self.ingredients[slot] = frozenset(items)
+        bit = 1 << slot
+        for ingredient in items:
+            self.masks[ingredient] |= bit
+        self.sizes[len(items)] |= bit
+
+    def build(self):
+        self.reset()
+        for recipe, items in sorted(self.load().items()):
+            self.add(recipe, items)
+
+    def get_changes(self, version):
+        if self.version is None:
+            return None
+        if not 0 < version - self.version <= settings.PANTRY_CHANGE_LOG_SIZE:
+            return None
+        keys = [
+            change_key(number)
+            for number in range(self.version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return None
+        return set(changes.values())
+
+    def sync(self, recipes):
+        ingredients = self.load(recipes)
+        for recipe in sorted(recipes):
+            if ingredients[recipe]:
+                self.add(recipe, ingredients[recipe])
+            else:
+                self.remove(recipe)
+
+    def refresh(self):
+        version = get_version(PANTRY_VERSION)
+        if version == self.version:
+            return
+        with self.lock, primary_reads():
+            if version == self.version:
+                return
+            changes = self.get_changes(version)
+            stale = len(self.recipes) > 2 * len(self.slots)
+            if changes is None or stale:
+                self.build()
+            else:
+                self.sync(changes)
+            self.version = version
+
+    def count_matches(self, pantry):
+        planes = []
+        for ingredient in pantry:
+            carry = self.masks.get(ingredient, 0)
+            for position, plane in enumerate(planes):
+                planes[position], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+        return planes
+
+    def matching(self, planes, count):
+        mask = (1 << len(self.recipes)) - 1
+        for position, plane in enumerate(planes):
+            mask &= plane if count >> position & 1 else ~plane
+        return mask if count < 1 << len(planes) else 0
+
+    def search(self, ingredients, max_missing, limit):
+        self.refresh()
+        pantry = frozenset(ingredients)
+        matches = []
+        with self.lock:
+            planes = self.count_matches(pantry)
+            for missing in range(max_missing + 1):
+                for size in sorted(self.sizes, reverse=True):
+                    if size <= missing:
+                        continue
+                    found = self.sizes[size] & self.matching(
+                        planes, size - missing
+                    )
+                    for slot in iter_bits(found):
+                        matches.append(PantryMatch(
+                            self.recipes[slot],
+                            self.ingredients[slot] - pantry,
+                            (size - missing) / size
+                        ))
+                        if len(matches) == limit:
+                            return matches
+        return matches
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
+from foodgram_project.replicas import primary_reads
+
+from api.caches import get_version, relations_version
+from api.models import Favorite, ShoppingCart
+from users.models import Follow
+
+
+class UserRelations:
+    def __init__(self, favorites=(), shopping_cart=(), following=()):
+        self.favorites = frozenset(favorites)
+        self.shopping_cart = frozenset(shopping_cart)
+        self.following = frozenset(following)
+
+    @classmethod
+    def load(cls, user):
+        return cls(
+            favorites=Favorite.objects.filter(
+                user=user
+            ).values_list('recipe_id', flat=True),
+            shopping_cart=ShoppingCart.objects.filter(
+                user=user
+            ).values_list('recipe_id', flat=True),
+            following=Follow.objects.filter(
+                user=user
+            ).values_list('following_id', flat=True),
+        )
+
+
+ANONYMOUS_RELATIONS = UserRelations()
+
+
+def get_user_relations(request):
+    if request is None or request.user.is_anonymous:
+        return ANONYMOUS_RELATIONS
+    relations = getattr(request, 'user_relations', None)
+    if relations is not None:
+        return relations
+    user = request.user
+    key = 'relations:{}:{}'.format(
+        user.id, get_version(relations_version(user.id))
+    )
+    relations = cache.get(key)
+    if relations is None:
+        with primary_reads():
+            relations = UserRelations.load(user)
+        cache.set(key, relations, settings.USER_RELATIONS_CACHE_TIMEOUT)
+    request.user_relations = relations
+    return relations
@@ -0,0 +1,103 @@
+import csv
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework.renderers import BaseRenderer
+
+PDF_FONT = 'ShoppingList'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListTextRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def format_data(self, data):
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.format_data(data).encode(self.charset)
+
+    def iter_shopping_list(self, ingredients):
+        yield 'Список покупок:\n'
+        for ingredient in ingredients:
+            yield (
+                f'{ingredient["ingredient__name"]} - '
+                f'{ingredient["ingredient_total"]} '
+                f'{ingredient["ingredient__measurement_unit"]}\n'
+            )
+
+
+class ShoppingListCSVRenderer(ShoppingListTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def iter_shopping_list(self, ingredients):
+        writer = csv.writer(Echo())
+        yield '\ufeff' + writer.writerow(
+            ('Ингредиент', 'Количество', 'Единица измерения')
+        )
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient_total'],
+                ingredient['ingredient__measurement_unit'],
+            ))
+
+
+class ShoppingListPDFRenderer(ShoppingListTextRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def register_font(self):
+        if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(PDF_FONT, settings.SHOPPING_LIST_PDF_FONT)
+            )
+
+    def build(self, lines):
+        self.register_font()
+        buffer = BytesIO()
+        width, height = A4
+        pdf = Canvas(buffer, pagesize=A4)
+        pdf.setFont(PDF_FONT, PDF_FONT_SIZE)
+        top = height - PDF_MARGIN
+        for line in lines:
+            for part in simpleSplit(
+                line.rstrip('\n'), PDF_FONT, PDF_FONT_SIZE,
+                width - 2 * PDF_MARGIN
+            ):
+                if top < PDF_MARGIN:
+                    pdf.showPage()
+                    pdf.setFont(PDF_FONT, PDF_FONT_SIZE)
+                    top = height - PDF_MARGIN
+                pdf.drawString(PDF_MARGIN, top, part)
+                top -= PDF_LINE_HEIGHT
+        pdf.save()
+        buffer.seek(0)
+        return buffer
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.build(self.format_data(data).splitlines()).getvalue()
+
+    def iter_shopping_list(self, ingredients):
+        buffer = self.build(super().iter_shopping_list(ingredients))
+        yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
@@ -0,0 +1,127 @@
+import bisect
+import re
+import threading
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection, transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from foodgram_project.replicas import primary_reads
+
+from api.caches import INGREDIENTS_VERSION, get_version
+from api.models import Ingredient, Recipe, RecipeSearchToken
+
+SEARCH_CONFIG = 'russian'
+RECIPE_SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+)
+
+
+def normalize(value):
+    return value.strip().casefold().replace('ё', 'е')
+
+
+def tokenize(value):
+    return [token[:200] for token in re.findall(r'\w+', normalize(value))]
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.version = None
+        self.entries = ((), ())
+        self.lock = threading.Lock()
+
+    def build(self):
+        ingredients = sorted(
+            (
+                (normalize(ingredient['name']), ingredient)
+                for ingredient in Ingredient.objects.values(
+                    'id', 'name', 'measurement_unit'
+                ).iterator()
+            ),
+            key=lambda entry: (entry[0], entry[1]['id'])
+        )
+        self.entries = (
+            tuple(key for key, __ in ingredients),
+            tuple(ingredient for __, ingredient in ingredients),
+        )
+
+    def refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self.version:
+            return
+        with self.lock, primary_reads():
+            if version != self.version:
+                self.build()
+                self.version = version
+
+    def search(self, query):
+        self.refresh()
+        keys, ingredients = self.entries
+        query = normalize(query)
+        start = bisect.bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        return list(ingredients[start:end]) + [
+            ingredient for position, (key, ingredient)
+            in enumerate(zip(keys, ingredients))
+            if query in key and not start <= position < end
+        ]
+
+
+ingredient_index = IngredientIndex()
+
+
+def update_search_tokens(recipes=None):
+    queryset = Recipe.objects.all()
+    stale = RecipeSearchToken.objects.all()
+    if recipes is not None:
+        queryset = queryset.filter(pk__in=recipes)
+        stale = stale.filter(recipe__in=recipes)
+    tokens = []
+    for pk, name, text in queryset.values_list('pk', 'name', 'text'):
+        name_tokens = set(tokenize(name))
+        tokens += [
+            RecipeSearchToken(
+                recipe_id=pk, token=token, in_name=token in name_tokens
+            ) for token in name_tokens.union(tokenize(text))
+        ]
+    with transaction.atomic():
+        stale.delete()
+        RecipeSearchToken.objects.bulk_create(tokens, batch_size=1000)
+    return queryset.count()
+
+
+def update_search_vectors(recipes=None):
+    if connection.vendor != 'postgresql':
+        return update_search_tokens(recipes)
+    queryset = Recipe.objects.all()
+    if recipes is not None:
+        queryset = queryset.filter(pk__in=recipes)
+    return queryset.update(search_vector=RECIPE_SEARCH_VECTOR)
+
+
+def has_token(term, **lookups):
+    return Exists(RecipeSearchToken.objects.filter(
+        recipe=OuterRef('pk'), token__startswith=term, **lookups
+    ))
+
+
+def search_recipes(queryset, text):
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date')
+    terms = tokenize(text)
+    for term in terms:
+        queryset = queryset.filter(has_token(term))
+    return queryset.annotate(rank=sum(
+        (Case(When(has_token(term, in_name=True), then=Value(1)),
+              default=Value(0)) for term in terms),
+        Value(0)
+    )).order_by('-rank', '-pub_date')
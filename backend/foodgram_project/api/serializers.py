@@ -1,8 +1,16 @@
-from drf_extra_fields.fields import Base64ImageField
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from foodgram_project.replicas import primary_reads
 from rest_framework import serializers
 
+from api.caches import recipe_representation_keys, representation_cache
+from api.fields import ImageVariantsField, LimitedBase64ImageField
+from api.images import schedule_image_variants
 from api.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                        ShoppingCart, Tag)
+                        ShoppingCart, Tag, prefetch_recipe_related)
+from api.relations import get_user_relations
+from api.signals import recipe_ingredients_changed
 from users.serializers import CustomUserSerializer
 
 
@@ -30,44 +38,98 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, models.Manager) else data
+        return self.child.represent(list(recipes))
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
+            'cooking_time'
+        )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent([instance])[0]
+
+    def represent(self, recipes):
+        request = self.context.get('request')
+        keys = recipe_representation_keys(recipes, request)
+        cached = representation_cache.get_many(keys)
+        fresh = self.load_from_primary([
+            recipe.pk for recipe, key in zip(recipes, keys)
+            if key not in cached and recipe._state.db != DEFAULT_DB_ALIAS
+        ])
+        prefetch_recipe_related([
+            recipe for recipe, key in zip(recipes, keys)
+            if key not in cached and recipe.pk not in fresh
+        ])
+        missing = {}
+        for recipe, key in zip(recipes, keys):
+            if key in cached:
+                continue
+            if recipe._state.db == DEFAULT_DB_ALIAS:
+                missing[key] = super().to_representation(recipe)
+            elif recipe.pk in fresh:
+                missing[key] = super().to_representation(fresh[recipe.pk])
+            else:
+                cached[key] = super().to_representation(recipe)
+        representation_cache.set_many(missing)
+        cached.update(missing)
+        relations = get_user_relations(request)
+        return [
+            self.personalize(cached[key], recipe, relations)
+            for recipe, key in zip(recipes, keys)
+        ]
+
+    def load_from_primary(self, pks):
+        if not pks:
+            return {}
+        with primary_reads():
+            return Recipe.objects.with_related().in_bulk(pks)
+
+    def personalize(self, cached, instance, relations):
+        data = dict(cached)
+        data['author'] = dict(
+            cached['author'],
+            is_subscribed=instance.author_id in relations.following
         )
+        data['is_favorited'] = instance.id in relations.favorites
+        data['is_in_shopping_cart'] = instance.id in relations.shopping_cart
+        return data
 
     def get_ingredients(self, obj):
-        ingredients = IngredientInRecipe.objects.filter(recipe=obj)
-        return IngredientInRecipeSerializer(ingredients, many=True).data
+        return IngredientInRecipeSerializer(
+            obj.recipe_ingredients.all(), many=True
+        ).data
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return Favorite.objects.filter(user=request.user, recipe=obj).exists()
+        relations = get_user_relations(self.context.get('request'))
+        return obj.id in relations.favorites
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return ShoppingCart.objects.filter(
-            user=request.user, recipe=obj
-        ).exists()
+        relations = get_user_relations(self.context.get('request'))
+        return obj.id in relations.shopping_cart
 
 
 class IngredientInRecipeWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(
+        min_value=1,
+        error_messages={'min_value': 'Количество должно быть больше 0'}
     )
-    amount = serializers.IntegerField()
 
     class Meta:
         model = IngredientInRecipe
@@ -75,12 +137,10 @@ class IngredientInRecipeWriteSerializer(serializers.ModelSerializer):
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientInRecipeWriteSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = LimitedBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -89,58 +149,94 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             'name', 'text', 'cooking_time'
         )
 
-    def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
+    def validate_ingredients(self, ingredients):
         if not ingredients:
-            raise serializers.ValidationError({
-                'ingredients': 'Нужно выбрать хотя бы один ингредиент!'
-            })
-        ingredients_list = []
+            raise serializers.ValidationError(
+                'Нужно выбрать хотя бы один ингредиент!'
+            )
+        ids = Counter(ingredient['id'] for ingredient in ingredients)
+        existing = set(Ingredient.objects.filter(
+            id__in=ids
+        ).values_list('id', flat=True))
+        errors = []
         for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError({
-                    'ingredients': 'Ингредиенты не уникальны'
-                })
-            ingredients_list.append(ingredient_id)
-            amount = ingredient['amount']
-            if int(amount) <= 0:
-                raise serializers.ValidationError({
-                    'amount': 'Количество должно быть больше 0'
-                })
-
-        tags = self.initial_data.get('tags')
+            if ingredient['id'] not in existing:
+                errors.append({'id': [
+                    f'Ингредиента с id={ingredient["id"]} не существует'
+                ]})
+            elif ids[ingredient['id']] > 1:
+                errors.append({'id': ['Ингредиенты не уникальны']})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return ingredients
+
+    def validate_tags(self, tags):
         if not tags:
-            raise serializers.ValidationError({
-                'tags': 'Нужно выбрать хотя бы один тэг'
-            })
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise serializers.ValidationError({
-                    'tags': 'Тэги не уникальны'
-                })
-            tags_list.append(tag)
-
-        cooking_time = self.initial_data.get('cooking_time')
-        if int(cooking_time) <= 0:
-            raise serializers.ValidationError({
-                'cooking_time': 'Время приготовления должно быть больше 0'
-            })
-
-        return data
+            raise serializers.ValidationError(
+                'Нужно выбрать хотя бы один тэг'
+            )
+        if len(set(tags)) != len(tags):
+            raise serializers.ValidationError('Тэги не уникальны')
+        missing = set(tags) - set(Tag.objects.filter(
+            id__in=tags
+        ).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                'Тэгов с id={} не существует'.format(
+                    ', '.join(str(tag) for tag in sorted(missing))
+                )
+            )
+        return tags
+
+    def validate_cooking_time(self, cooking_time):
+        if cooking_time <= 0:
+            raise serializers.ValidationError(
+                'Время приготовления должно быть больше 0'
+            )
+        return cooking_time
 
     def create_ingredients(self, ingredients, recipe):
         IngredientInRecipe.objects.bulk_create([IngredientInRecipe(
             recipe=recipe,
-            ingredient=ingredient['id'],
+            ingredient_id=ingredient['id'],
             amount=ingredient['amount']
         ) for ingredient in ingredients])
 
+    def update_ingredients(self, ingredients, recipe):
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        removed = existing.keys() - amounts.keys()
+        added = amounts.keys() - existing.keys()
+        changed = [
+            row for row in existing.values()
+            if row.amount != amounts.get(row.ingredient_id, row.amount)
+        ]
+        for row in changed:
+            row.amount = amounts[row.ingredient_id]
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientInRecipe.objects.bulk_create([IngredientInRecipe(
+            recipe=recipe,
+            ingredient_id=ingredient_id,
+            amount=amounts[ingredient_id]
+        ) for ingredient_id in added])
+        return removed | added | {row.ingredient_id for row in changed}
+
     def create_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        recipe.tags.set(tags)
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
@@ -148,40 +244,95 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=author, **validated_data)
         self.create_tags(tags, recipe)
         self.create_ingredients(ingredients, recipe)
+        schedule_image_variants(recipe)
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            recipe=recipe,
+            ingredients=[ingredient['id'] for ingredient in ingredients]
+        )
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
+        stale_variants = instance.image_variants
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            instance.image_variants = {}
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
-
-        instance.tags.clear()
-        tags = validated_data.get('tags')
-        self.create_tags(tags, instance)
-
-        IngredientInRecipe.objects.filter(recipe=instance).all().delete()
-        ingredients = validated_data.get('ingredients')
-        self.create_ingredients(ingredients, instance)
+        if 'tags' in validated_data:
+            self.create_tags(validated_data['tags'], instance)
+        changed_ingredients = set()
+        if 'ingredients' in validated_data:
+            changed_ingredients = self.update_ingredients(
+                validated_data['ingredients'], instance
+            )
 
         instance.save()
+        if 'image' in validated_data:
+            schedule_image_variants(instance, stale_variants)
+        if changed_ingredients:
+            recipe_ingredients_changed.send(
+                sender=Recipe,
+                recipe=instance,
+                ingredients=changed_ingredients
+            )
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
         return RecipeSerializer(
-            instance,
+            Recipe.objects.with_related().get(pk=instance.pk),
             context=context
         ).data
 
 
 class RecipeRepresentationSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100
+    )
+
+
+class RecipeRelationResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    recipe = RecipeRepresentationSerializer(required=False)
+
+
+class PantrySearchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, max_value=5, default=2
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class PantryRecipeSerializer(RecipeRepresentationSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing_ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta(RecipeRepresentationSerializer.Meta):
+        fields = RecipeRepresentationSerializer.Meta.fields + (
+            'coverage', 'missing_ingredients'
+        )
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
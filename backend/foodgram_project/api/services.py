@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+
+from api.caches import bump_version, relations_version
+from api.models import (Favorite, FeedEntry, IngredientInRecipe, Recipe,
+                        ShoppingCart, ShoppingCartIngredient)
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', 'favorites'),
+    (User, 'recipes_count', 'recipes'),
+    (User, 'followers_count', 'following'),
+)
+
+
+def get_shopping_cart_totals(users=None, ingredients=None):
+    lookups = {'recipe__recipe_ingredients__isnull': False}
+    if users is not None:
+        lookups['user__in'] = users
+    if ingredients is not None:
+        lookups['recipe__recipe_ingredients__ingredient__in'] = ingredients
+    return ShoppingCart.objects.filter(**lookups).order_by().values(
+        'user', 'recipe__recipe_ingredients__ingredient'
+    ).annotate(total=Sum('recipe__recipe_ingredients__amount'))
+
+
+def refresh_shopping_cart_ingredients(users=None, ingredients=None):
+    stale = ShoppingCartIngredient.objects.all()
+    if users is not None:
+        stale = stale.filter(user__in=users)
+    if ingredients is not None:
+        stale = stale.filter(ingredient__in=ingredients)
+    totals = get_shopping_cart_totals(users, ingredients)
+    with transaction.atomic():
+        stale.delete()
+        ShoppingCartIngredient.objects.bulk_create(
+            [ShoppingCartIngredient(
+                user_id=total['user'],
+                ingredient_id=total['recipe__recipe_ingredients__ingredient'],
+                amount=total['total']
+            ) for total in totals],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+
+
+def change_counter(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def reconcile_counters():
+    fixed = {}
+    for model, field, relation in COUNTERS:
+        drifted = list(model.objects.annotate(
+            actual=Count(relation)
+        ).exclude(**{field: F('actual')}).only('pk'))
+        for obj in drifted:
+            setattr(obj, field, obj.actual)
+        model.objects.bulk_update(drifted, [field], batch_size=1000)
+        fixed[f'{model._meta.model_name}.{field}'] = len(drifted)
+    return fixed
+
+
+def insert_relations(model, user, recipe_ids):
+    if not recipe_ids:
+        return []
+    table = connection.ops.quote_name(model._meta.db_table)
+    rows = ', '.join(['(%s, %s)'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, recipe_id) VALUES {rows} '
+            'ON CONFLICT DO NOTHING RETURNING recipe_id',
+            [value for pk in recipe_ids for value in (user.pk, pk)]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def delete_relations(model, user, recipe_ids):
+    if not recipe_ids:
+        return []
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE user_id = %s '
+            f'AND recipe_id IN ({placeholders}) RETURNING recipe_id',
+            [user.pk, *recipe_ids]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def apply_relation_changes(model, user, recipe_ids, delta):
+    if not recipe_ids:
+        return
+    if model is Favorite:
+        change_counter(
+            Recipe.objects.filter(pk__in=recipe_ids), 'favorites_count', delta
+        )
+    if model is ShoppingCart:
+        refresh_shopping_cart_ingredients(
+            users=[user.pk],
+            ingredients=IngredientInRecipe.objects.filter(
+                recipe__in=recipe_ids
+            ).values('ingredient')
+        )
+    bump_version(relations_version(user.pk))
+
+
+@transaction.atomic
+def add_recipes_to_relation(model, user, recipe_ids):
+    recipes = Recipe.objects.in_bulk(recipe_ids)
+    added = insert_relations(model, user, list(recipes))
+    apply_relation_changes(model, user, added, 1)
+    return recipes, added
+
+
+@transaction.atomic
+def remove_recipes_from_relation(model, user, recipe_ids):
+    recipes = Recipe.objects.in_bulk(recipe_ids)
+    removed = delete_relations(model, user, list(recipes))
+    apply_relation_changes(model, user, removed, -1)
+    return recipes, removed
+
+
+def fan_out_recipe(recipe):
+    followers = Follow.objects.filter(
+        following_id=recipe.author_id
+    ).values_list('user', flat=True)
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user, recipe=recipe, pub_date=recipe.pub_date)
+         for user in followers.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+def backfill_feed(user_id, author_id):
+    recipes = Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date').values_list('pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+         for pk, pub_date in recipes[:settings.FEED_BACKFILL_SIZE]],
+        ignore_conflicts=True
+    )
+
+
+def trim_feed(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def rebuild_feeds():
+    recent = defaultdict(list)
+    recipes = Recipe.objects.order_by(
+        'author', '-pub_date'
+    ).values_list('author', 'pk', 'pub_date')
+    for author, pk, pub_date in recipes.iterator():
+        if len(recent[author]) < settings.FEED_BACKFILL_SIZE:
+            recent[author].append((pk, pub_date))
+    follows = Follow.objects.values_list('user', 'following')
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user, recipe_id=pk, pub_date=pub_date)
+             for user, author in follows.iterator()
+             for pk, pub_date in recent[author]],
+            batch_size=1000
+        )
+    return FeedEntry.objects.count()
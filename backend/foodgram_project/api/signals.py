@@ -0,0 +1,203 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+
+from api.caches import (INGREDIENTS_VERSION, TAGS_VERSION, bump_version,
+                        recipe_version, relations_version)
+from api.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                        ShoppingCart, SimilarRecipe, Tag)
+from api.pantry import record_pantry_change
+from api.search import update_search_vectors
+from api.services import (change_counter, fan_out_recipe,
+                          refresh_shopping_cart_ingredients)
+from api.similarity import refresh_similar_recipes, update_similar_recipes
+from users.models import User
+
+recipe_ingredients_changed = Signal()
+
+
+def recipe_ingredients(recipe_id):
+    return IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values('ingredient')
+
+
+def recipe_carts(recipe_id):
+    return ShoppingCart.objects.filter(recipe_id=recipe_id).values('user')
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def update_shopping_cart_ingredients(sender, instance, **kwargs):
+    if kwargs.get('created') is False:
+        return
+    refresh_shopping_cart_ingredients(
+        users=[instance.user_id],
+        ingredients=recipe_ingredients(instance.recipe_id)
+    )
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def update_carts_with_ingredient(sender, instance, **kwargs):
+    refresh_shopping_cart_ingredients(
+        users=recipe_carts(instance.recipe_id),
+        ingredients=[instance.ingredient_id]
+    )
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_carts_with_recipe(sender, recipe, ingredients, **kwargs):
+    refresh_shopping_cart_ingredients(
+        users=recipe_carts(recipe.id), ingredients=ingredients
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_carts(sender, instance, **kwargs):
+    instance.cart_users = list(recipe_carts(instance.id))
+    instance.cart_ingredients = list(recipe_ingredients(instance.id))
+
+
+@receiver(post_delete, sender=Recipe)
+def update_carts_without_recipe(sender, instance, **kwargs):
+    if getattr(instance, 'cart_users', None):
+        refresh_shopping_cart_ingredients(
+            users=[cart['user'] for cart in instance.cart_users],
+            ingredients=[
+                ingredient['ingredient']
+                for ingredient in instance.cart_ingredients
+            ]
+        )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_version(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_relations_version(sender, instance, **kwargs):
+    bump_version(relations_version(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version(sender, instance, **kwargs):
+    if isinstance(instance, Recipe):
+        bump_version(recipe_version(instance.pk))
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def bump_recipe_ingredients_version(sender, instance, **kwargs):
+    bump_version(recipe_version(instance.recipe_id))
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def bump_changed_recipe_version(sender, recipe, **kwargs):
+    bump_version(recipe_version(recipe.pk))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def update_favorites_count(sender, instance, **kwargs):
+    created = kwargs.get('created')
+    if created is False:
+        return
+    change_counter(
+        Recipe.objects.filter(pk=instance.recipe_id),
+        'favorites_count',
+        1 if created else -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def update_recipes_count(sender, instance, **kwargs):
+    created = kwargs.get('created')
+    if created is False:
+        return
+    change_counter(
+        User.objects.filter(pk=instance.author_id),
+        'recipes_count',
+        1 if created else -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
+
+
+def schedule_similar_recipes_update(recipe):
+    if getattr(recipe, 'similar_recipes_scheduled', False):
+        return
+    recipe.similar_recipes_scheduled = True
+
+    def update():
+        recipe.similar_recipes_scheduled = False
+        update_similar_recipes(recipe.pk)
+    transaction.on_commit(update)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_similar_on_ingredients(sender, recipe, **kwargs):
+    schedule_similar_recipes_update(recipe)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_similar_on_tags(sender, instance, action, **kwargs):
+    if isinstance(instance, Recipe) and action.startswith('post_'):
+        schedule_similar_recipes_update(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_similar_lists(sender, instance, **kwargs):
+    instance.similar_lists = list(SimilarRecipe.objects.filter(
+        similar_id=instance.pk
+    ).values_list('recipe', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def refill_similar_lists(sender, instance, **kwargs):
+    recipes = getattr(instance, 'similar_lists', None)
+    if recipes:
+        transaction.on_commit(lambda: refresh_similar_recipes(recipes))
+
+
+def schedule_pantry_change(recipe_id):
+    transaction.on_commit(lambda: record_pantry_change(recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def record_deleted_recipe_in_pantry(sender, instance, **kwargs):
+    schedule_pantry_change(instance.pk)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def record_recipe_ingredient_in_pantry(sender, instance, **kwargs):
+    schedule_pantry_change(instance.recipe_id)
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def record_recipe_ingredients_in_pantry(sender, recipe, **kwargs):
+    schedule_pantry_change(recipe.pk)
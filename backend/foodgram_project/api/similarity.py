@@ -0,0 +1,166 @@
+import heapq
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from api.models import IngredientInRecipe, Recipe, SimilarRecipe
+
+INGREDIENTS_WEIGHT = 0.8
+TAGS_WEIGHT = 0.2
+
+
+def similarity(shared, size, other_size, tags, other_tags):
+    union = size + other_size - shared
+    score = INGREDIENTS_WEIGHT * shared / union if union else 0
+    tags_union = len(tags | other_tags)
+    if tags_union:
+        score += TAGS_WEIGHT * len(tags & other_tags) / tags_union
+    return score
+
+
+def top_similar(scores):
+    return heapq.nlargest(
+        settings.SIMILAR_RECIPES_SIZE, scores.items(), key=itemgetter(1)
+    )
+
+
+def common_ingredient_limit(recipes_count):
+    return max(
+        settings.SIMILAR_RECIPES_MIN_POSTINGS,
+        int(recipes_count * settings.SIMILAR_RECIPES_MAX_SHARE)
+    )
+
+
+def load_features(recipes=None):
+    ingredients = IngredientInRecipe.objects.values_list(
+        'recipe', 'ingredient'
+    )
+    tags = Recipe.tags.through.objects.values_list('recipe', 'tag')
+    if recipes is not None:
+        ingredients = ingredients.filter(recipe__in=recipes)
+        tags = tags.filter(recipe__in=recipes)
+    recipe_ingredients = defaultdict(set)
+    for recipe, ingredient in ingredients.iterator():
+        recipe_ingredients[recipe].add(ingredient)
+    recipe_tags = defaultdict(frozenset)
+    for recipe, tag in tags.iterator():
+        recipe_tags[recipe] |= {tag}
+    return recipe_ingredients, recipe_tags
+
+
+def score_candidates(recipe, shared, ingredients, tags):
+    size = len(ingredients[recipe])
+    return {
+        other: similarity(
+            count, size, len(ingredients[other]), tags[recipe], tags[other]
+        ) for other, count in shared.items()
+    }
+
+
+def rebuild_similar_recipes():
+    ingredients, tags = load_features()
+    postings = defaultdict(list)
+    for recipe, items in ingredients.items():
+        for ingredient in items:
+            postings[ingredient].append(recipe)
+    limit = common_ingredient_limit(len(ingredients))
+    entries = []
+    for recipe, items in ingredients.items():
+        shared = Counter()
+        for ingredient in items:
+            if len(postings[ingredient]) <= limit:
+                shared.update(postings[ingredient])
+        del shared[recipe]
+        scores = score_candidates(recipe, shared, ingredients, tags)
+        entries += [
+            SimilarRecipe(recipe_id=recipe, similar_id=other, score=score)
+            for other, score in top_similar(scores)
+        ]
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        SimilarRecipe.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def get_shared_ingredients(recipe_ids):
+    limit = common_ingredient_limit(Recipe.objects.count())
+    sources = defaultdict(set)
+    for recipe, ingredient in IngredientInRecipe.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('recipe', 'ingredient'):
+        sources[ingredient].add(recipe)
+    rare = IngredientInRecipe.objects.filter(
+        ingredient__in=sources
+    ).order_by().values('ingredient').annotate(
+        postings=Count('id')
+    ).filter(postings__lte=limit).values('ingredient')
+    shared = defaultdict(Counter)
+    for recipe, ingredient in IngredientInRecipe.objects.filter(
+        ingredient__in=rare
+    ).values_list('recipe', 'ingredient').iterator():
+        for source in sources[ingredient] - {recipe}:
+            shared[source][recipe] += 1
+    return shared
+
+
+def get_reverse_entries(recipe_id, scores):
+    lists = defaultdict(list)
+    for pk, recipe, score in SimilarRecipe.objects.filter(
+        recipe__in=scores
+    ).values_list('pk', 'recipe', 'score'):
+        lists[recipe].append((score, pk))
+    entries, stale = [], []
+    for other, score in scores.items():
+        current = lists[other]
+        if len(current) >= settings.SIMILAR_RECIPES_SIZE:
+            lowest = min(current)
+            if score <= lowest[0]:
+                continue
+            stale.append(lowest[1])
+        entries.append(
+            SimilarRecipe(recipe_id=other, similar_id=recipe_id, score=score)
+        )
+    return entries, stale
+
+
+def get_similar_entries(recipe_ids):
+    shared = get_shared_ingredients(recipe_ids)
+    ingredients, tags = load_features({
+        *recipe_ids, *(other for counts in shared.values() for other in counts)
+    })
+    scores = {
+        recipe: score_candidates(recipe, shared[recipe], ingredients, tags)
+        for recipe in recipe_ids
+    }
+    return scores, [
+        SimilarRecipe(recipe_id=recipe, similar_id=other, score=score)
+        for recipe in recipe_ids
+        for other, score in top_similar(scores[recipe])
+    ]
+
+
+@transaction.atomic
+def refresh_similar_recipes(recipe_ids):
+    recipe_ids = set(recipe_ids)
+    _, entries = get_similar_entries(recipe_ids)
+    SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+    SimilarRecipe.objects.bulk_create(entries)
+
+
+@transaction.atomic
+def update_similar_recipes(recipe_id):
+    holders = set(SimilarRecipe.objects.filter(
+        similar_id=recipe_id
+    ).values_list('recipe', flat=True))
+    recipe_ids = {recipe_id, *holders}
+    scores, entries = get_similar_entries(recipe_ids)
+    SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+    reverse, stale = get_reverse_entries(recipe_id, {
+        other: score for other, score in scores[recipe_id].items()
+        if other not in holders
+    })
+    SimilarRecipe.objects.filter(pk__in=stale).delete()
+    SimilarRecipe.objects.bulk_create(entries + reverse)
@@ -0,0 +1,285 @@
+import tempfile
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (AsyncClient, TestCase, TransactionTestCase,
+                         override_settings)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.management.commands import explain_queries
+from api.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                        ShoppingCart, Tag)
+from api.serializers import RecipeCreateSerializer
+from users.authentication import CachedTokenAuthentication
+from users.models import Follow, User
+
+IMAGE = 'recipes/images/test.png'
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            ) for number in range(4)
+        ]
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Тестовый', password='password'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                first_name='Автор', last_name=f'Тестовый{number}',
+                password='password'
+            ) for number in range(6)
+        ]
+        cls.recipes = []
+        for number in range(12):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % len(cls.authors)],
+                name=f'Суп {number}' if number % 2 else f'Салат {number}',
+                image=IMAGE,
+                text='Описание рецепта',
+                cooking_time=10,
+            )
+            recipe.tags.set(tags)
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                ) for ingredient in ingredients[number % 2:number % 2 + 3]
+            ])
+            cls.recipes.append(recipe)
+        for recipe in cls.recipes[::3]:
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, following=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assert_page_queries(self, expected, url, sizes, client=None):
+        client = client or self.client
+        for size in sizes:
+            cache.clear()
+            with self.subTest(size=size), self.assertNumQueries(expected):
+                response = client.get(url.format(size=size))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), size)
+
+    def test_recipe_list(self):
+        self.assert_page_queries(8, '/api/recipes/?limit={size}', (2, 10))
+
+    def test_recipe_list_anonymous(self):
+        self.assert_page_queries(
+            5, '/api/recipes/?limit={size}', (2, 10), client=APIClient()
+        )
+
+    def test_recipe_list_with_warm_caches(self):
+        self.client.get('/api/recipes/?limit=10')
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/recipes/?limit=10')
+        favorited = {
+            recipe['id'] for recipe in response.json()['results']
+            if recipe['is_favorited']
+        }
+        self.assertEqual(favorited, set(
+            Favorite.objects.filter(
+                user=self.reader, recipe__in=[
+                    recipe['id'] for recipe in response.json()['results']
+                ]
+            ).values_list('recipe', flat=True)
+        ))
+
+    def test_recipe_detail(self):
+        for recipe in self.recipes[:2]:
+            cache.clear()
+            with self.subTest(recipe=recipe.pk), self.assertNumQueries(8):
+                response = self.client.get(f'/api/recipes/{recipe.pk}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['ingredients']), 3)
+
+    def test_recipe_detail_with_warm_caches(self):
+        url = f'/api/recipes/{self.recipes[0].pk}/'
+        expected = self.client.get(url).json()
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), expected)
+
+    def test_subscriptions(self):
+        self.assert_page_queries(
+            3, '/api/users/subscriptions/?limit={size}&recipes_limit=1',
+            (2, 6)
+        )
+
+    def test_recipe_search(self):
+        self.assert_page_queries(
+            5, '/api/recipes/?search=СУП&limit={size}', (2, 6),
+            client=APIClient()
+        )
+        response = APIClient().get('/api/recipes/?search=суп')
+        self.assertEqual(
+            {recipe['name'] for recipe in response.json()},
+            {recipe.name for recipe in self.recipes if 'Суп' in recipe.name}
+        )
+
+    def test_shopping_list_formats(self):
+        cases = (
+            ({}, 'text/plain; charset=utf-8'),
+            ({'HTTP_ACCEPT': 'application/json'}, 'text/plain; charset=utf-8'),
+            ({'HTTP_ACCEPT': 'text/csv'}, 'text/csv; charset=utf-8'),
+            ({'HTTP_ACCEPT': 'application/pdf'}, 'application/pdf'),
+        )
+        for headers, content_type in cases:
+            with self.subTest(headers=headers):
+                response = self.client.get(
+                    '/api/recipes/download_shopping_cart/', **headers
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], content_type)
+
+    def test_query_plans(self):
+        call_command('explain_queries', stdout=StringIO())
+
+    def test_index_scans_are_reported(self):
+        command = explain_queries.Command()
+        recipes = Recipe.objects.order_by('-pub_date', '-id')
+        for queryset in (recipes, recipes.values('pk', 'pub_date')):
+            with self.subTest(query=str(queryset.query)):
+                self.assertEqual(
+                    command.find_sequential_scans(queryset.explain()),
+                    {Recipe._meta.db_table}
+                )
+        self.assertEqual(command.find_sequential_scans(
+            recipes.explain(), 'recipe_author_pub_date_idx'
+        ), {Recipe._meta.db_table})
+
+
+class CounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Тестовый', password='password'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Тестовый', password='password'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Суп', image=IMAGE,
+            text='Описание рецепта', cooking_time=10
+        )
+
+    def test_recipe_edit_keeps_concurrent_favorite(self):
+        request = APIRequestFactory().patch('/')
+        request.user = self.author
+        serializer = RecipeCreateSerializer(
+            Recipe.objects.get(pk=self.recipe.pk),
+            data={'name': 'Борщ'}, partial=True,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        serializer.save()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.name, 'Борщ')
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_user_save_keeps_concurrent_follow(self):
+        author = User.objects.get(pk=self.author.pk)
+        Follow.objects.create(user=self.reader, following=self.author)
+        author.first_name = 'Повар'
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.first_name, 'Повар')
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(author.recipes_count, 1)
+
+
+class AsyncViewsTest(TransactionTestCase):
+    def test_errors_match_drf(self):
+        tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Тестовый', password='password'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Суп', image=IMAGE,
+            text='Описание рецепта', cooking_time=10
+        )
+        recipe.tags.set([tag])
+        urls = (
+            'recipes/0/',
+            'tags/0/',
+            'ingredients/0/',
+            'recipes/?limit=1&page=2',
+            'recipes/?limit=1&page=0',
+            'recipes/?limit=1&page=last_but_one',
+            'recipes/?limit=0&page=2',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                expected = self.client.get(f'/api/{url}')
+                actual = async_to_sync(AsyncClient().get)(f'/api/async/{url}')
+                self.assertEqual(actual.status_code, expected.status_code)
+                self.assertEqual(actual['Content-Type'], 'application/json')
+                self.assertEqual(actual.json(), expected.json())
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def test_cache_hit_returns_token(self):
+        user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Тестовый', password='password'
+        )
+        token = Token.objects.create(user=user)
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        results = [
+            CachedTokenAuthentication().authenticate(request)
+            for _ in range(2)
+        ]
+        for authenticated, auth in results:
+            self.assertIsInstance(auth, Token)
+            self.assertEqual(auth.key, token.key)
+            self.assertEqual(auth.user_id, user.pk)
+            self.assertEqual(authenticated.pk, user.pk)
+
+
+class GenerateDatasetTest(TestCase):
+    def test_skipped_users_get_no_data(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        admin = User.objects.create_user(
+            username='admin', email='user1@example.com',
+            first_name='Админ', last_name='Тестовый', password='password'
+        )
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    'generate_dataset', users=3, recipes=12, favorites=2,
+                    cart=1, follows=1, stdout=StringIO()
+                )
+        self.assertFalse(User.objects.filter(username='user1').exists())
+        self.assertFalse(admin.recipes.exists())
+        self.assertFalse(admin.favorites.exists())
+        self.assertFalse(admin.follower.exists())
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(
+            set(Recipe.objects.values_list('author__username', flat=True)),
+            {'user2', 'user3'}
+        )
@@ -1,50 +1,86 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import F
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from foodgram_project.settings import SHOPPING_LIST_NAME
+from foodgram_project.settings import SHOPPING_LIST_NAME, SIMILAR_RECIPES_SIZE
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from api.filters import IngredientSearchFilter, RecipeFilter
-from api.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                        ShoppingCart, Tag)
-from api.paginations import LimitResultsSetPagination
+from api.caches import (INGREDIENTS_VERSION, TAGS_VERSION, catalog_etag,
+                        recipe_etag)
+from api.filters import RecipeFilter
+from api.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                        ShoppingCartIngredient, Tag)
+from api.paginations import (CursorPaginationMixin, FeedCursorPagination,
+                             LimitResultsSetPagination, RecipeCursorPagination)
+from api.pantry import pantry_index
 from api.permissions import OwnerAdminReadOnly
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListPDFRenderer,
+                           ShoppingListTextRenderer)
+from api.search import ingredient_index
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
-                             RecipeCreateSerializer, RecipeSerializer,
+                             PantryRecipeSerializer, PantrySearchSerializer,
+                             RecipeCreateSerializer, RecipeIdsSerializer,
+                             RecipeRelationResultSerializer,
+                             RecipeRepresentationSerializer, RecipeSerializer,
                              ShoppingCartSerializer, TagSerializer)
+from api.services import add_recipes_to_relation, remove_recipes_from_relation
 
 
+@method_decorator(condition(etag_func=catalog_etag(TAGS_VERSION)), 'list')
+@method_decorator(
+    condition(etag_func=catalog_etag(TAGS_VERSION)), 'retrieve'
+)
 class TagsViewSet(ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = TagSerializer
 
 
+@method_decorator(
+    condition(etag_func=catalog_etag(INGREDIENTS_VERSION)), 'list'
+)
+@method_decorator(
+    condition(etag_func=catalog_etag(INGREDIENTS_VERSION)), 'retrieve'
+)
 class IngredientsViewSet(ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = IngredientSerializer
-    filter_backends = [IngredientSearchFilter]
-    search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
-class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.all()
+
+@method_decorator(condition(etag_func=recipe_etag), 'retrieve')
+class RecipeViewSet(CursorPaginationMixin, ModelViewSet):
     permission_classes = [OwnerAdminReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     pagination_class = LimitResultsSetPagination
+    cursor_pagination_class = RecipeCursorPagination
+
+    def get_queryset(self):
+        return Recipe.objects.select_related('author')
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(
+            request, force or self.action == 'download_shopping_cart'
+        )
+
     @action(
         methods=('post',),
         detail=True,
@@ -69,6 +105,53 @@ class RecipeViewSet(ModelViewSet):
         favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def change_relation_in_bulk(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        if request.method == 'POST':
+            recipes, changed = add_recipes_to_relation(
+                model, request.user, recipe_ids
+            )
+            statuses = ('added', 'exists')
+        else:
+            recipes, changed = remove_recipes_from_relation(
+                model, request.user, recipe_ids
+            )
+            statuses = ('removed', 'missing')
+        changed = set(changed)
+        results = []
+        for pk in recipe_ids:
+            if pk not in recipes:
+                results.append({'id': pk, 'status': 'not_found'})
+                continue
+            results.append({
+                'id': pk,
+                'status': statuses[0] if pk in changed else statuses[1],
+                'recipe': recipes[pk],
+            })
+        return Response({'results': RecipeRelationResultSerializer(
+            results, many=True, context={'request': request}
+        ).data})
+
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='favorite',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_in_bulk(self, request):
+        return self.change_relation_in_bulk(request, Favorite)
+
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_in_bulk(self, request):
+        return self.change_relation_in_bulk(request, ShoppingCart)
+
     @action(
         methods=('post',),
         detail=True,
@@ -93,25 +176,87 @@ class RecipeViewSet(ModelViewSet):
         shopping_cart.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(detail=False, permission_classes=[AllowAny])
+    def pantry(self, request):
+        params = PantrySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matches = pantry_index.search(**params.validated_data)
+        recipes = Recipe.objects.in_bulk(
+            [match.recipe_id for match in matches]
+        )
+        ingredients = Ingredient.objects.in_bulk(set().union(
+            *(match.missing for match in matches)
+        ))
+        results = []
+        for match in matches:
+            recipe = recipes.get(match.recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = match.coverage
+            recipe.missing_ingredients = [
+                ingredients[pk] for pk in match.missing if pk in ingredients
+            ]
+            results.append(recipe)
+        serializer = PantryRecipeSerializer(
+            results, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(detail=True, permission_classes=[AllowAny])
+    def similar(self, request, pk):
+        get_object_or_404(Recipe, id=pk)
+        recipes = Recipe.objects.filter(
+            similar_to__recipe_id=pk
+        ).order_by('-similar_to__score')[:SIMILAR_RECIPES_SIZE]
+        serializer = RecipeRepresentationSerializer(
+            recipes, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedCursorPagination,
+        cursor_pagination_class=FeedCursorPagination
+    )
+    def feed(self, request):
+        queryset = Recipe.objects.select_related('author').filter(
+            feed_entries__user=request.user
+        ).annotate(feed_date=F('feed_entries__pub_date'))
+        page = self.paginate_queryset(queryset)
+        serializer = RecipeSerializer(
+            page, many=True, context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListPDFRenderer,
+        ]
+    )
     def download_shopping_cart(self, request):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_carts__user=request.user
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user
         ).order_by(
             'ingredient__name'
         ).values(
             'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(ingredient_total=Sum('amount'))
-        shopping_cart = 'Список покупок:\n'
-        for ingredient in ingredients:
-            shopping_cart += (
-                f'{ingredient["ingredient__name"]} - '
-                f'{ingredient["ingredient_total"]} '
-                f'{ingredient["ingredient__measurement_unit"]}\n'
-            )
-        response = HttpResponse(shopping_cart, content_type='text/plain')
+            'ingredient__measurement_unit',
+            ingredient_total=F('amount')
+        )
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.iter_shopping_list(ingredients.iterator()),
+            content_type=content_type
+        )
         response['Content-Disposition'] = (
-            f'attachment; filename="{SHOPPING_LIST_NAME}'
+            f'attachment; filename="{SHOPPING_LIST_NAME}.{renderer.format}"'
         )
         return response
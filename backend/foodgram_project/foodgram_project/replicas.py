@@ -0,0 +1,131 @@
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import isawaitable
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_APPS = ('authtoken', 'sessions')
+
+use_primary = ContextVar('use_primary', default=True)
+current_replica = ContextVar('current_replica', default=None)
+unavailable_until = {}
+
+
+def mark_unavailable(alias):
+    unavailable_until[alias] = (
+        time.monotonic() + settings.DATABASE_REPLICA_RETRY
+    )
+
+
+def is_available(alias):
+    if unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except OperationalError:
+        mark_unavailable(alias)
+        return False
+    return True
+
+
+def choose_replica():
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_available(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def get_replica():
+    alias = current_replica.get()
+    if alias is None or not is_available(alias):
+        alias = choose_replica()
+        current_replica.set(alias)
+    return alias
+
+
+@contextmanager
+def primary_reads():
+    token = use_primary.set(True)
+    try:
+        yield
+    finally:
+        use_primary.reset(token)
+
+
+def pin_key(request):
+    identity = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'primary-pin:{}'.format(
+        hashlib.sha256(identity.encode()).hexdigest()
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_primary.get() or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return get_replica()
+
+    def db_for_write(self, model, **hints):
+        use_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = pin_key(request)
+        writes = request.method not in SAFE_METHODS
+        use_primary.set(writes or cache.get(key) is not None)
+        current_replica.set(None if use_primary.get() else choose_replica())
+        try:
+            response = self.get_response(request)
+        finally:
+            if writes:
+                cache.set(key, True, settings.READ_AFTER_WRITE_WINDOW)
+            use_primary.set(True)
+            current_replica.set(None)
+        return response
+
+    def process_exception(self, request, exception):
+        alias = current_replica.get()
+        if (
+            not isinstance(exception, OperationalError)
+            or alias in (None, DEFAULT_DB_ALIAS)
+            or use_primary.get()
+        ):
+            return None
+        mark_unavailable(alias)
+        use_primary.set(True)
+        current_replica.set(None)
+        match = request.resolver_match
+        response = match.func(request, *match.args, **match.kwargs)
+        if isawaitable(response):
+            return async_to_sync(wait_for)(response)
+        return response
+
+
+async def wait_for(awaitable):
+    return await awaitable
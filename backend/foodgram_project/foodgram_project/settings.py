@@ -1,4 +1,5 @@
 import os
+from itertools import zip_longest
 from os.path import join
 from pathlib import Path
 
@@ -35,7 +36,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram_project.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,6 +70,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram_project.wsgi.application'
+ASGI_APPLICATION = 'foodgram_project.asgi.application'
 
 DATABASES = {
     'default': {
@@ -75,10 +79,54 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0)),
     }
 }
 
+DATABASE_REPLICAS = []
+for number, (host, name) in enumerate(zip_longest(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+    filter(None, os.getenv('DB_REPLICA_NAMES', default='').split(',')),
+), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host or DATABASES['default']['HOST'],
+        'NAME': name or DATABASES['default']['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram_project.replicas.ReplicaRouter']
+DATABASE_REPLICA_RETRY = 30
+READ_AFTER_WRITE_WINDOW = int(
+    os.getenv('READ_AFTER_WRITE_WINDOW', default=5)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
+    }
+}
+
+USER_RELATIONS_CACHE_TIMEOUT = 300
+
+TOKEN_CACHE_SIZE = 4096
+TOKEN_CACHE_ALIAS = os.getenv('TOKEN_CACHE_ALIAS')
+TOKEN_CACHE_TIMEOUT = 60
+TOKEN_CACHE_LOCAL_TIMEOUT = 0 if TOKEN_CACHE_ALIAS else 5
+
+RECIPE_REPRESENTATION_CACHE_SIZE = 2048
+RECIPE_REPRESENTATION_CACHE_ALIAS = os.getenv(
+    'RECIPE_REPRESENTATION_CACHE_ALIAS'
+)
+RECIPE_REPRESENTATION_CACHE_TIMEOUT = 3600
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -115,7 +163,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ),
 }
 
@@ -137,6 +185,53 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'django_static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=5 * 1024 ** 2)
+)
+RECIPE_IMAGE_VARIANTS = {
+    'list': (480, 480),
+    'detail': (1280, 1280),
+}
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default=2))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-SHOPPING_LIST_NAME = 'shopping_list.txt'
+SHOPPING_LIST_NAME = 'shopping_list'
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default=os.path.join(BASE_DIR, 'data', 'fonts', 'DejaVuSans.ttf')
+)
+
+FEED_BACKFILL_SIZE = 100
+
+SIMILAR_RECIPES_SIZE = 10
+SIMILAR_RECIPES_MAX_SHARE = 0.05
+SIMILAR_RECIPES_MIN_POSTINGS = 50
+
+PANTRY_CHANGE_LOG_SIZE = 1000
+PANTRY_CHANGE_LOG_TIMEOUT = 3600
+
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.getenv('SQL_INSTRUMENTATION', default='False') == 'True',
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', default=500)),
+    'MAX_QUERIES': 30,
+    'DUPLICATE_THRESHOLD': 3,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,52 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from api.caches import TieredCache
+from users.models import User
+
+USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in (
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'is_active', 'is_staff', 'is_superuser',
+    )
+]
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+token_cache = TieredCache(
+    settings.TOKEN_CACHE_SIZE,
+    alias=settings.TOKEN_CACHE_ALIAS,
+    timeout=settings.TOKEN_CACHE_TIMEOUT,
+    local_timeout=settings.TOKEN_CACHE_LOCAL_TIMEOUT
+)
+
+
+def token_cache_key(key):
+    return 'auth-token:{}'.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_tokens(*keys):
+    for key in keys:
+        token_cache.delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate(self, request):
+        self.use_cache = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        if not self.use_cache:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        values = token_cache.get(cache_key)
+        if values is not None:
+            user = User.from_db('default', USER_FIELDS, values)
+            return user, self.get_model()(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(
+            cache_key, tuple(getattr(user, field) for field in USER_FIELDS)
+        )
+        return user, token
@@ -0,0 +1,57 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.caches import bump_version, relations_version, user_version
+from api.services import backfill_feed, change_counter, trim_feed
+from users.authentication import invalidate_tokens
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=User)
+def bump_user_version(sender, instance, **kwargs):
+    bump_version(user_version(instance.id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follower_relations_version(sender, instance, **kwargs):
+    bump_version(relations_version(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def update_followers_count(sender, instance, **kwargs):
+    created = kwargs.get('created')
+    if created is False:
+        return
+    change_counter(
+        User.objects.filter(pk=instance.following_id),
+        'followers_count',
+        1 if created else -1
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(['last_login']):
+        return
+    invalidate_tokens(
+        *Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follower_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_follower_feed(sender, instance, **kwargs):
+    trim_feed(instance.user_id, instance.following_id)
@@ -1,14 +1,32 @@
+from django.db.models import OuterRef, Prefetch, Subquery
 from rest_framework import status
 from rest_framework.generics import ListAPIView, get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.paginations import LimitResultsSetPagination
+from api.models import Recipe
+from api.paginations import (CursorPaginationMixin, FollowCursorPagination,
+                             LimitResultsSetPagination)
 from users.models import Follow, User
 from users.serializers import FollowListSerializer, FollowSerializer
 
 
+def get_subscriptions(user, recipes_limit=None):
+    recipes = Recipe.objects.all()
+    if recipes_limit is not None:
+        recipes = recipes.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('pk')[:max(recipes_limit, 0)]
+        ))
+    return User.objects.filter(
+        following__user=user
+    ).prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='recent_recipes')
+    )
+
+
 class FollowApiView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -29,13 +47,22 @@ class FollowApiView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FollowListAPIView(ListAPIView):
+class FollowListAPIView(CursorPaginationMixin, ListAPIView):
     pagination_class = LimitResultsSetPagination
+    cursor_pagination_class = FollowCursorPagination
     permission_classes = [IsAuthenticated]
 
+    def get_recipes_limit(self):
+        try:
+            return int(self.request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+
+    def get_queryset(self):
+        return get_subscriptions(self.request.user, self.get_recipes_limit())
+
     def get(self, request):
-        user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
         serializer = FollowListSerializer(
             page, many=True,